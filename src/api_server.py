@@ -19,6 +19,7 @@ from run_lyrics_comparison import (
     get_audio_predictions
 )
 from lyrics_classifier_free import FreeLyricsClassifier
+from thresholds import AUDIO_LOW_CONF_THRESHOLD, LYRICS_LOW_CONF_THRESHOLD
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for frontend
@@ -35,10 +36,6 @@ model_data = None
 # Initialize lyrics classifier
 lyrics_classifier = None
 
-# Thresholds
-AUDIO_LOW_CONF_THRESHOLD = 0.35
-LYRICS_LOW_CONF_THRESHOLD = 0.6
-
 def load_models():
     """Load models once at startup"""
     global model_data, lyrics_classifier
@@ -3,9 +3,29 @@ from pathlib import Path
 import pandas as pd
 from sklearn.model_selection import train_test_split
 
+# Polars runs the load + clean of the mapped CSV as one lazy, multithreaded plan
+try:
+    import polars as pl
+    POLARS_AVAILABLE = True
+    #collect(engine=...) only exists from polars 1.23, older 1.x takes streaming=True
+    POLARS_ENGINE_ARG = tuple(int(p) for p in pl.__version__.split(".")[:2]) >= (1, 23)
+except ImportError:
+    POLARS_AVAILABLE = False
+
+# Arrow's regex kernels clean the loudness strings without per-element python calls
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
 
 BASE = Path(__file__).resolve().parents[1]
 PROCESSED = BASE / "data" / "processed" / "songs_mapped.csv"
+#written by csv_to_parquet.py, preferred over the CSV when it exists
+PROCESSED_PARQUET = PROCESSED.with_suffix(".parquet")
 BALANCED_PATH = BASE / "data" / "processed" / "songs_mapped_20k_balanced.csv"
 RANDOM_STATE = 42
 
@@ -24,30 +44,58 @@ FEATURE_WISHLIST = [
 
 #cleaning up the strings of loudness
 def clean_loudness(series: pd.Series) -> pd.Series:
+    if PYARROW_AVAILABLE:
+        # everything but digits, signs, dots and the unicode minus goes in one pass
+        # (that also covers whitespace and the "dB" suffix)
+        arr = pa.array(series.astype("string"), from_pandas=True)
+        arr = pc.replace_substring_regex(arr, "[^0-9.+\\-\u2212]", "")
+        arr = pc.replace_substring(arr, "\u2212", "-")
+        arr = pc.if_else(pc.equal(arr, ""), pa.scalar(None, pa.string()), arr)
+        try:
+            values = pc.cast(arr, pa.float64()).to_numpy(zero_copy_only=False)
+        except pa.ArrowInvalid:
+            # leftovers like "-" or "1.2.3", let pandas coerce them to NaN
+            values = pd.to_numeric(arr.to_pandas(), errors="coerce").to_numpy()
+        return pd.Series(values, index=series.index, name=series.name).clip(-60, 0)
+
     s = series.astype(str).str.strip()
     s = s.str.replace("\u2212", "-", regex=False)
     s = s.str.replace(r"[dD][bB]", "", regex=True)
     s = s.str.replace(r"[^0-9\.\-\+]", "", regex=True)
     return pd.to_numeric(s, errors="coerce").clip(-60, 0)
 
+#mapped CSV column names -> the names used everywhere else
+RENAMER = {
+    "Tempo": "tempo",
+    "Energy": "energy",
+    "Positiveness": "valence",
+    "Loudness (db)": "loudness_src",
+    "Loudness (dB)": "loudness_src",
+    "Danceability": "danceability",
+    "Speechiness": "speechiness",
+    "Liveness": "liveness",
+    "Acousticness": "acousticness",
+    "Instrumentalness": "instrumentalness",
+    "Artist(s)": "artists",
+    "song": "track_name",
+}
+
+#columns that leak the label or are not audio features
+LEAK_PREFIXES = ("Good for ", "Similar ", "Similarity Score")
+
+#rows per chunk when the mapped CSV is read with pandas
+MAPPED_CHUNKSIZE = 200_000
+
+#the leak columns are dropped by normalize_features anyway, so they are never parsed.
+#everything else is kept, it all goes into the balanced CSV (lyrics included)
+def mapped_usecols(header) -> list:
+    return [c for c in header if c != "Album" and not c.startswith(LEAK_PREFIXES)]
+
+#renames and drops happen in place on the frame passed in (callers always reassign it anyway)
 def normalize_features(df: pd.DataFrame) -> pd.DataFrame:
-    renamer = {
-        "Tempo": "tempo",
-        "Energy": "energy",
-        "Positiveness": "valence",
-        "Loudness (db)": "loudness_src",
-        "Loudness (dB)": "loudness_src",
-        "Danceability": "danceability",
-        "Speechiness": "speechiness",
-        "Liveness": "liveness",
-        "Acousticness": "acousticness",
-        "Instrumentalness": "instrumentalness",
-        "Artist(s)": "artists",
-        "song": "track_name",
-    }
-    present = {k: v for k, v in renamer.items() if k in df.columns}
+    present = {k: v for k, v in RENAMER.items() if k in df.columns}
     if present:
-        df = df.rename(columns=present)
+        df.rename(columns=present, inplace=True)
 
     need_loudness = ("loudness" not in df.columns) or (df["loudness"].notna().sum() == 0)
     if need_loudness:
@@ -61,13 +109,59 @@ def normalize_features(df: pd.DataFrame) -> pd.DataFrame:
         if src is not None:
             df["loudness"] = clean_loudness(src)
 
-    leak_prefixes = ("Good for ", "Similar ", "Similarity Score")
-    drop_cols = [c for c in df.columns if c == "Album" or any(c.startswith(p) for p in leak_prefixes)]
+    drop_cols = [c for c in df.columns if c == "Album" or any(c.startswith(p) for p in LEAK_PREFIXES)]
     if drop_cols:
-        df = df.drop(columns=drop_cols, errors="ignore")
+        df.drop(columns=drop_cols, errors="ignore", inplace=True)
 
     return df
 
+def mapped_source() -> Path:
+    if PROCESSED_PARQUET.exists() and (POLARS_AVAILABLE or PYARROW_AVAILABLE):
+        return PROCESSED_PARQUET
+    return PROCESSED
+
+def scan_mapped(path) -> pd.DataFrame:
+    # normalize_features + the TARGETS filter as one lazy polars plan, only the
+    # kept rows and columns are ever materialized
+    if Path(path).suffix == ".parquet":
+        lf = pl.scan_parquet(path)
+    else:
+        #whole-file schema inference, like csv_to_parquet.py
+        lf = pl.scan_csv(path, infer_schema_length=None)
+    cols = lf.collect_schema().names()
+    if "mood" not in cols:
+        raise ValueError("Expecting the mood column in the mapped CSV.")
+
+    cols = mapped_usecols(cols)
+    lf = lf.select(cols)
+    present = {k: v for k, v in RENAMER.items() if k in cols}
+    lf = lf.rename(present)
+    cols = [present.get(c, c) for c in cols]
+
+    if "loudness_src" in cols:
+        cleaned = (
+            pl.col("loudness_src").cast(pl.Utf8).str.strip_chars()
+              .str.replace_all("\u2212", "-", literal=True)
+              .str.replace_all(r"[dD][bB]", "")
+              .str.replace_all(r"[^0-9\.\-\+]", "")
+              .cast(pl.Float64, strict=False)
+              .clip(-60, 0)
+        )
+        # only replace loudness when it is missing entirely, like normalize_features
+        if "loudness" in cols:
+            cleaned = (
+                pl.when(pl.col("loudness").is_not_null().any())
+                  .then(pl.col("loudness"))
+                  .otherwise(cleaned)
+            )
+        lf = lf.with_columns(cleaned.alias("loudness"))
+
+    drop_cols = [c for c in cols if c == "Album" or c.startswith(LEAK_PREFIXES)]
+    lf = lf.drop(drop_cols).filter(pl.col("mood").is_in(TARGETS))
+    if POLARS_ENGINE_ARG:
+        return lf.collect(engine="streaming").to_pandas()
+    return lf.collect(streaming=True).to_pandas()
+
 def balanced_downsample(df: pd.DataFrame,
                         label_col: str = "mood",
                         max_per_class: int = None,
@@ -87,17 +181,40 @@ def balanced_downsample(df: pd.DataFrame,
     )
 
 def load_audio_data():
-    if not PROCESSED.exists():
+    source = mapped_source()
+    if not source.exists():
         raise FileNotFoundError(f"Mapped file not found: {PROCESSED}.")
 
-    df = pd.read_csv(PROCESSED)
-    df = normalize_features(df)
+    df = None
+    if POLARS_AVAILABLE:
+        try:
+            df = scan_mapped(source)
+        except Exception as e:
+            #any polars problem (an old version, a parse error...) falls back to the
+            #pandas reader below, which raises on real data errors itself
+            print(f"Polars load failed ({e}), reading with pandas instead")
 
-    if "mood" not in df.columns:
-        raise ValueError("Expecting the mood column in the mapped CSV.")
+    if df is None and source.suffix == ".parquet" and PYARROW_AVAILABLE:
+        header = pq.read_schema(source).names
+        if "mood" not in header:
+            raise ValueError("Expecting the mood column in the mapped CSV.")
+
+        # column and mood filters are pushed down into the parquet reader
+        df = pd.read_parquet(source, columns=mapped_usecols(header), filters=[("mood", "in", TARGETS)])
+        df = normalize_features(df)
+    elif df is None:
+        #pandas can only read the parquet copy through pyarrow, so this is always the CSV
+        source = PROCESSED
+        header = pd.read_csv(source, nrows=0).columns
+        if "mood" not in header:
+            raise ValueError("Expecting the mood column in the mapped CSV.")
 
-    # keep only target moods
-    df = df[df["mood"].isin(TARGETS)].copy()
+        # keep only target moods, filtered chunk by chunk so the other rows never pile up
+        usecols = mapped_usecols(header)
+        reader = pd.read_csv(source, usecols=usecols, chunksize=MAPPED_CHUNKSIZE)
+        chunks = [chunk[chunk["mood"].isin(TARGETS)] for chunk in reader]
+        df = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=usecols)
+        df = normalize_features(df)
     if df.empty:
         raise ValueError("After filtering to TARGETS, no rows remain.")
 
@@ -51,7 +51,9 @@ def plot_accuracy_bar(results):
 def plot_rf_confusion_and_confidence(model, X_test, y_test):
     # RF (or best model) confusion matrix
     labels_in_test = sorted(set(TARGETS) & set(y_test.unique()))
-    y_pred = model.predict(X_test)
+    # one predict_proba pass gives both the labels and the confidences
+    proba = model.predict_proba(X_test)
+    y_pred = model.classes_[proba.argmax(axis=1)]
 
     cm = confusion_matrix(y_test, y_pred, labels=labels_in_test)
     disp = ConfusionMatrixDisplay(confusion_matrix=cm, display_labels=labels_in_test)
@@ -62,7 +64,6 @@ def plot_rf_confusion_and_confidence(model, X_test, y_test):
     plt.close()
 
     # confidence distribution
-    proba = model.predict_proba(X_test)
     max_conf = proba.max(axis=1)
 
     plt.figure()
@@ -1,8 +1,6 @@
 import pandas as pd
 import numpy as np
 from pathlib import Path
-import matplotlib.pyplot as plt
-import seaborn as sns
 from sklearn.metrics import confusion_matrix, accuracy_score, classification_report
 
 # Simple comparison function
@@ -54,7 +52,7 @@ def compare_predictions(df, audio_pred_col='audio_prediction', lyrics_pred_col='
     disagreement_df = df_clean[df_clean[audio_pred_col] != df_clean[lyrics_pred_col]]
     if len(disagreement_df) > 0:
         print("Disagreement patterns (audio to lyrics):")
-        disagreement_patterns = disagreement_df.groupby([audio_pred_col, lyrics_pred_col]).size()
+        disagreement_patterns = disagreement_df.groupby([audio_pred_col, lyrics_pred_col], observed=True).size()
         for (audio, lyrics), count in disagreement_patterns.items():
             print(f"  {audio:8s} -> {lyrics:8s}: {count} songs")
         print()
@@ -78,6 +76,10 @@ def compare_predictions(df, audio_pred_col='audio_prediction', lyrics_pred_col='
 def create_comparison_visualization(df, audio_pred_col='audio_prediction', 
                                    lyrics_pred_col='lyrics_prediction', 
                                    save_path='audio_lyrics_comparison.png'):
+    # matplotlib/seaborn take a while to import, only pay for it when plotting
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
     print(f"Creating visualization.")
     
     # Filter out rows with missing predictions
@@ -0,0 +1,32 @@
+import pandas as pd
+from pathlib import Path
+
+# Polars streams the CSV straight into the parquet file without loading it all
+try:
+    import polars as pl
+    POLARS_AVAILABLE = True
+except ImportError:
+    POLARS_AVAILABLE = False
+
+BASE = Path(__file__).resolve().parents[1]
+DATA_DIR = BASE / "data" / "processed"
+INPUT_FILE = DATA_DIR / "songs_mapped.csv"
+OUTPUT_FILE = INPUT_FILE.with_suffix(".parquet")
+
+def csv_to_parquet(input_path, output_path):
+
+    print(f"Converting {input_path} -> {output_path}...")
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    if POLARS_AVAILABLE:
+        # infer the schema from the whole file so a late odd value can't break the sink
+        pl.scan_csv(input_path, infer_schema_length=None).sink_parquet(output_path, compression="snappy")
+    else:
+        df = pd.read_csv(input_path)
+        df.to_parquet(output_path, compression="snappy", index=False)
+
+    print(f"Saved {output_path} ({output_path.stat().st_size / 1e6:.1f} MB, "
+          f"csv was {input_path.stat().st_size / 1e6:.1f} MB)")
+
+if __name__ == "__main__":
+    csv_to_parquet(INPUT_FILE, OUTPUT_FILE)
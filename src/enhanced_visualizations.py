@@ -3,6 +3,7 @@ import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 from pathlib import Path
+import hashlib
 import joblib
 import sys
 import warnings
@@ -18,6 +19,13 @@ try:
 except ImportError:
     TSNE_AVAILABLE = False
 
+# GPU t-SNE from RAPIDS, used instead of sklearn's when a CUDA GPU is present
+try:
+    from cuml.manifold import TSNE as cuTSNE
+    CUML_AVAILABLE = True
+except ImportError:
+    CUML_AVAILABLE = False
+
 # Import audio data utilities
 sys.path.append(str(Path(__file__).parent))
 from audio_data import load_audio_data, TARGETS, FEATURE_WISHLIST
@@ -111,8 +119,9 @@ def plot_audio_confidence_by_mood(save_path=None):
         model = bundle["pipeline"]
         X_train, X_cv, X_test, y_train, y_cv, y_test, feature_names = load_audio_data()
 
-        y_pred_audio = model.predict(X_test)
+        # predict is just the argmax of predict_proba, no need for a second pass
         proba_audio = model.predict_proba(X_test)
+        y_pred_audio = model.classes_[proba_audio.argmax(axis=1)]
         max_conf_audio = proba_audio.max(axis=1)
 
         conf_by_mood = []
@@ -192,6 +201,68 @@ def plot_lyrics_confidence_by_mood(df,
 # Mood map (PCA)
 
 
+def _tsne_perplexity(n_points):
+    # perplexity must be < n_points
+    return min(30, max(5, n_points // 100))
+
+
+def _projection_backend(method):
+    return "cuml" if method == "tsne" and CUML_AVAILABLE else "sklearn"
+
+
+def _compute_projection(method, X_scaled):
+    # returns the embedding and the backend that actually computed it
+    if method == "tsne":
+        n_points = X_scaled.shape[0]
+        perplexity = _tsne_perplexity(n_points)
+        n_iter = 500
+        if CUML_AVAILABLE:
+            print(f"Computing t-SNE embedding on GPU (n={n_points}, perplexity={perplexity})")
+            try:
+                return np.asarray(cuTSNE(
+                    n_components=2,
+                    random_state=42,
+                    perplexity=perplexity,
+                    n_iter=n_iter,
+                ).fit_transform(X_scaled.astype(np.float32))), "cuml"
+            except Exception as e:
+                print(f"WARNING: cuML t-SNE failed ({e}), falling back to sklearn")
+        reducer = TSNE(
+            n_components=2,
+            random_state=42,
+            perplexity=perplexity,
+            n_iter=n_iter,
+        )
+        print(f"Computing t-SNE embedding (n={n_points}, perplexity={perplexity})")
+    else:
+        reducer = PCA(n_components=2, random_state=42)
+        print("Computing PCA embedding (fast)")
+    return reducer.fit_transform(X_scaled), "sklearn"
+
+
+def _projection_cache_path(method, backend, n_samples, X_scaled):
+    # cuML and sklearn give different embeddings, so the backend and the
+    # t-SNE perplexity are part of the key next to the input matrix
+    perplexity = _tsne_perplexity(X_scaled.shape[0]) if method == "tsne" else None
+    key = hashlib.md5(f"{method}:{backend}:{perplexity}:{n_samples}".encode())
+    key.update(np.ascontiguousarray(X_scaled).tobytes())
+    return FIG_DIR / f"proj_{key.hexdigest()}.npz"
+
+
+def _cached_projection(method, n_samples, X_scaled):
+    # t-SNE is the slowest plot to make, so keep embeddings on disk keyed by
+    # method, backend, sample size and the exact input matrix
+    cache_path = _projection_cache_path(method, _projection_backend(method), n_samples, X_scaled)
+    if cache_path.exists():
+        print(f"Using cached {method.upper()} embedding from {cache_path}")
+        return np.load(cache_path)["X_2d"]
+
+    X_2d, backend = _compute_projection(method, X_scaled)
+    # a failed cuML run falls back to sklearn, store it under the sklearn key
+    np.savez(_projection_cache_path(method, backend, n_samples, X_scaled), X_2d=X_2d)
+    return X_2d
+
+
 def plot_mood_map(df=None, method="tsne", n_samples=3000, save_path=None):
     if save_path is None:
         save_path = FIG_DIR / f"mood_map_{method}.png"
@@ -220,7 +291,9 @@ def plot_mood_map(df=None, method="tsne", n_samples=3000, save_path=None):
         # Sample for speed
         n_total = len(X_all)
         if n_total > n_samples:
-            idx = np.random.choice(n_total, n_samples, replace=False)
+            # Fixed seed so the same songs are picked each run and the cached
+            # embedding stays valid
+            idx = np.random.default_rng(42).choice(n_total, n_samples, replace=False)
             X_sample = X_all.iloc[idx].copy()
             y_sample = y_all.iloc[idx] if y_all is not None else None
         else:
@@ -235,26 +308,11 @@ def plot_mood_map(df=None, method="tsne", n_samples=3000, save_path=None):
         X_scaled = scaler.fit_transform(X_sample)
 
         method_lower = method.lower()
-        if method_lower == "tsne":
-            n_points = X_scaled.shape[0]
-            # perplexity must be < n_points
-            perplexity = min(30, max(5, n_points // 100))
-            n_iter = 500
-            reducer = TSNE(
-                n_components=2,
-                random_state=42,
-                perplexity=perplexity,
-                n_iter=n_iter,
-            )
-            print(f"Computing t-SNE embedding (n={n_points}, perplexity={perplexity})")
-        elif method_lower == "pca":
-            reducer = PCA(n_components=2, random_state=42)
-            print("Computing PCA embedding (fast)")
-        else:
+        if method_lower not in ("tsne", "pca"):
             print(f"ERROR: Unknown method '{method}'. Use 'tsne' or 'pca'.")
             return
 
-        X_2d = reducer.fit_transform(X_scaled)
+        X_2d = _cached_projection(method_lower, n_samples, X_scaled)
         print(f"✓ {method.upper()} embedding complete!")
 
         # Plot
@@ -786,7 +844,7 @@ def main():
     print(" - PCA.")
     plot_mood_map(df=None, method="pca", n_samples=10000)
     print("  - t-SNE.")
-    plot_mood_map(df=None, method="tsne", n_samples=2000)
+    plot_mood_map(df=None, method="tsne", n_samples=20000 if CUML_AVAILABLE else 2000)
     print()
 
  
@@ -1,7 +1,10 @@
 
+import numpy as np
 import pandas as pd
 from pathlib import Path
 import os
+import functools
+from joblib import Parallel, delayed, effective_n_jobs, parallel_config
 
 # Try to import VADER
 try:
@@ -11,6 +14,44 @@ except ImportError:
     VADER_AVAILABLE = False
     print("VADER not installed. Run: pip install vaderSentiment")
 
+# Numba-compiled VADER scoring, same scores as polarity_scores
+try:
+    from vader_numba import NumbaVader
+    NUMBA_VADER_AVAILABLE = True
+except ImportError:
+    NUMBA_VADER_AVAILABLE = False
+
+
+HYPED_KEYWORDS = ['party', 'dance', 'energy', 'fire', 'wild', 'crazy', 'lit',
+                  'pump', 'beat', 'bass', 'drop', 'turnt', 'hype']
+
+# Below this many lyrics, starting worker processes costs more than it saves
+PARALLEL_MIN_TEXTS = 2000
+
+# joblib backend for the pure Python VADER path. The default loky processes get
+# around the GIL; PYVADER_BACKEND=threading shares this process's analyzer
+# instead of loading the lexicon in every worker, which can win on few cores
+VADER_BACKEND = os.environ.get("PYVADER_BACKEND", "loky")
+
+
+@functools.lru_cache(maxsize=1)
+def _analyzer():
+    # Parsing the lexicon files is most of the cost of an analyzer, so every
+    # classifier in a process (and every reused joblib worker) shares one
+    return SentimentIntensityAnalyzer()
+
+
+@functools.lru_cache(maxsize=1)
+def _fast_vader():
+    # Shared too, so its token vocabulary keeps growing instead of restarting
+    return NumbaVader(_analyzer())
+
+
+def _score_chunk(texts):
+    # Runs in a worker; in a process the analyzer is built there (once per
+    # worker) so the lexicon is never pickled, in a thread the shared one is used
+    return FreeLyricsClassifier().compound_scores(texts)
+
 
 class FreeLyricsClassifier:
 
@@ -19,7 +60,8 @@ class FreeLyricsClassifier:
         if not VADER_AVAILABLE:
             raise ImportError("VADER not installed. Run: pip install vaderSentiment")
         
-        self.analyzer = SentimentIntensityAnalyzer()
+        self.analyzer = _analyzer()
+        self.fast_vader = _fast_vader() if NUMBA_VADER_AVAILABLE else None
         self.mood_labels = ['happy', 'chill', 'sad', 'hyped']
         self.api_calls = 0  # Keep for compatibility
     
@@ -65,9 +107,7 @@ class FreeLyricsClassifier:
         
         # Check for "hyped" keywords    
         lyrics_lower = str(lyrics).lower()
-        hyped_keywords = ['party', 'dance', 'energy', 'fire', 'wild', 'crazy', 'lit', 
-                         'pump', 'beat', 'bass', 'drop', 'turnt', 'hype']
-        if any(keyword in lyrics_lower for keyword in hyped_keywords):
+        if any(keyword in lyrics_lower for keyword in HYPED_KEYWORDS):
             if compound > 0.2:  # Positive + energy = hyped
                 mood = 'hyped'
                 confidence = min(0.9, abs(compound) + 0.2)
@@ -84,8 +124,127 @@ class FreeLyricsClassifier:
         self.api_calls += 1
         return mood, confidence
     
+    def compound_scores(self, texts, n_jobs=1):
+        # VADER compound score per text, NaN where there are no lyrics.
+        # The Numba kernel already uses every core; pure Python VADER is
+        # spread over processes with n_jobs instead
+        if self.fast_vader is not None:
+            compound = np.full(len(texts), np.nan)
+            valid, valid_texts = [], []
+            for i, lyrics in enumerate(texts):
+                if not pd.isna(lyrics) and lyrics and str(lyrics).strip() != '':
+                    valid.append(i)
+                    valid_texts.append(str(lyrics))
+            if valid:
+                compound[valid] = self.fast_vader.compound(valid_texts)
+            return compound
+
+        if n_jobs != 1:
+            # only distinct lyrics are sent to the workers (missing ones get code -1),
+            # and the worker count is resolved for the backend that will run them
+            codes, unique_texts = pd.factorize(np.asarray(texts, dtype=object))
+            with parallel_config(backend=VADER_BACKEND):
+                n_workers = effective_n_jobs(n_jobs)
+            if n_workers > 1 and len(unique_texts) >= PARALLEL_MIN_TEXTS:
+                chunks = np.array_split(np.asarray(unique_texts, dtype=object), n_workers)
+                results = Parallel(n_jobs=n_workers, backend=VADER_BACKEND)(
+                    delayed(_score_chunk)(chunk) for chunk in chunks
+                )
+                unique_compound = np.concatenate(results)
+                compound = np.full(len(texts), np.nan)
+                compound[codes >= 0] = unique_compound[codes[codes >= 0]]
+                return compound
+
+        compound = np.full(len(texts), np.nan)
+        polarity_scores = self.analyzer.polarity_scores
+        for i, lyrics in enumerate(texts):
+            # isna first, Arrow-backed frames use pd.NA which can't be truth-tested
+            if not pd.isna(lyrics) and lyrics and str(lyrics).strip() != '':
+                compound[i] = polarity_scores(str(lyrics))['compound']
+        return compound
+
+    def cached_compound_scores(self, texts, cache_path, n_jobs=1):
+        # Same as compound_scores, but scores are kept in a parquet file keyed
+        # by a hash of the lyrics so reruns only score lyrics never seen before
+        cache_path = Path(cache_path)
+        hashes = pd.util.hash_pandas_object(
+            pd.Series(texts, dtype=object).fillna(''), index=False
+        ).to_numpy()
+
+        if cache_path.exists():
+            cache = pd.read_parquet(cache_path)
+        else:
+            cache = pd.DataFrame({'hash': np.array([], dtype=np.uint64),
+                                  'compound': np.array([], dtype=np.float64)})
+
+        positions = pd.Index(cache['hash']).get_indexer(hashes)
+        compound = np.full(len(texts), np.nan)
+        found = positions >= 0
+        compound[found] = cache['compound'].to_numpy()[positions[found]]
+
+        missing = np.flatnonzero(~found)
+        if len(missing) > 0:
+            texts = np.asarray(texts, dtype=object)
+            compound[missing] = self.compound_scores(texts[missing], n_jobs=n_jobs)
+            new_rows = pd.DataFrame({'hash': hashes[missing], 'compound': compound[missing]})
+            cache = pd.concat([cache, new_rows], ignore_index=True).drop_duplicates('hash')
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            cache.to_parquet(cache_path, index=False)
+
+        print(f"VADER cache: {found.sum()} cached, {len(missing)} newly scored")
+        return compound
+
+    def moods_from_scores(self, compound, texts):
+        # Same rules as classify_lyrics, applied to whole arrays at once
+        abs_c = np.abs(compound)
+        no_lyrics = np.isnan(compound)
+        is_hyped = pd.Series(texts, dtype=object).astype(str).str.lower().str.contains(
+            '|'.join(HYPED_KEYWORDS), regex=True
+        ).to_numpy()
+
+        with np.errstate(invalid='ignore'):
+            conditions = [
+                no_lyrics,
+                is_hyped & (compound > 0.2),
+                compound > 0.5,
+                compound > 0.1,
+                compound < -0.5,
+                (compound < -0.1) & (abs_c > 0.3),
+                compound < -0.1,
+            ]
+        moods = np.select(
+            conditions,
+            ['chill', 'hyped', 'happy', 'chill', 'sad', 'sad', 'chill'],
+            default='chill',
+        ).astype(object)
+        confidences = np.select(
+            conditions,
+            [
+                0.1,
+                np.minimum(0.9, abs_c + 0.2),
+                compound,
+                0.5 + (compound - 0.1) * 0.625,
+                abs_c,
+                abs_c,
+                0.55 + (0.3 - abs_c) * 0.5,
+            ],
+            default=0.65,  # Neutral songs are confidently "chill"
+        )
+        confidences = np.nan_to_num(np.clip(confidences, 0.0, 1.0), nan=0.1)
+        return moods, confidences
+
+    def classify_batch(self, texts, n_jobs=1, cache_path=None):
+        # Score every text first, then map all scores to moods in one go
+        if cache_path is not None:
+            compound = self.cached_compound_scores(texts, cache_path, n_jobs=n_jobs)
+        else:
+            compound = self.compound_scores(texts, n_jobs=n_jobs)
+        self.api_calls += int((~np.isnan(compound)).sum())
+        return self.moods_from_scores(compound, texts)
+
     def classify_dataset(self, df, lyrics_column='text', song_column='track_name', 
-                        artist_column='artists', max_songs=None, delay=0):
+                        artist_column='artists', max_songs=None, delay=0, n_jobs=1,
+                        cache_path=None):
         
         result_df = df.copy()
         
@@ -93,28 +252,15 @@ class FreeLyricsClassifier:
             raise ValueError(f"Lyrics column '{lyrics_column}' not found")
         
         if max_songs:
-            df_to_process = df.head(max_songs).copy()
+            df_to_process = df.head(max_songs)
         else:
-            df_to_process = df.copy()
-        
-        predictions = []
-        confidences = []
+            df_to_process = df
         
         print(f"Classifying {len(df_to_process)} songs using free VADER")
         print()
         
-        for idx, row in df_to_process.iterrows():
-            lyrics = row.get(lyrics_column, '')
-            song_name = row.get(song_column, None) if song_column in df.columns else None
-            artist = row.get(artist_column, None) if artist_column in df.columns else None
-            
-            mood, confidence = self.classify_lyrics(lyrics, song_name, artist)
-            
-            predictions.append(mood)
-            confidences.append(confidence)
-            
-            if (idx + 1) % 100 == 0:
-                print(f"Processed {idx + 1}/{len(df_to_process)} songs...")
+        texts = df_to_process[lyrics_column].to_numpy(dtype=object)
+        predictions, confidences = self.classify_batch(texts, n_jobs=n_jobs, cache_path=cache_path)
         
         # Add predictions
         result_df['lyrics_prediction'] = None
@@ -5,28 +5,33 @@ from enhanced_visualizations import (
     plot_low_confidence_by_mood,
     plot_low_confidence_hist,
 )
+from thresholds import AUDIO_LOW_CONF_THRESHOLD
 
 BASE = Path(__file__).resolve().parents[1]
 DATA_DIR = BASE / "data" / "processed"
 FIG_DIR = BASE / "figures"
 
 def main():
+    parquet_path = DATA_DIR / "songs_with_predictions.parquet"
     csv_path = DATA_DIR / "songs_with_predictions.csv"
-    print(f"Loading {csv_path} ...")
-    df = pd.read_csv(csv_path)
-
-    #updated threshold
-    NEW_AUDIO_LOW_CONF_THRESHOLD = 0.4
-
-    # Recompute audio low-confidence flag
+    # Prefer the parquet copy: faster to read and dtypes round-trip
+    if parquet_path.exists():
+        print(f"Loading {parquet_path} ...")
+        df = pd.read_parquet(parquet_path)
+    else:
+        print(f"Loading {csv_path} ...")
+        df = pd.read_csv(csv_path, engine="pyarrow")
+
+    # Recompute audio low-confidence flag in memory, the saved file is
+    # left untouched
     if "audio_confidence" not in df.columns:
-        raise ValueError("audio_confidence column missing in songs_with_predictions.csv")
+        raise ValueError("audio_confidence column missing in songs_with_predictions")
 
-    df["audio_low_confidence"] = df["audio_confidence"] < NEW_AUDIO_LOW_CONF_THRESHOLD
+    df["audio_low_confidence"] = df["audio_confidence"].to_numpy() < AUDIO_LOW_CONF_THRESHOLD
 
     FIG_DIR.mkdir(parents=True, exist_ok=True)
 
-    print("Recreating uncertainty plots with threshold 0.4 ...")
+    print(f"Recreating uncertainty plots with threshold {AUDIO_LOW_CONF_THRESHOLD} ...")
     plot_low_confidence_by_mood(
         df,
         save_path=str(FIG_DIR / "uncertainty_by_mood.png"),
@@ -1,13 +1,29 @@
 import pandas as pd
 from pathlib import Path
 import os
+import functools
 import joblib
 import sys
 import numpy as np
 
+# Try to import pyarrow for the multithreaded CSV reader
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pv
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+from audio_data import TARGETS
 from lyrics_classifier_free import FreeLyricsClassifier
+from thresholds import (
+    AUDIO_LOW_CONF_THRESHOLD,
+    AUDIO_BORDERLINE_MARGIN,
+    LYRICS_LOW_CONF_THRESHOLD,
+)
 from compare_audio_lyrics import compare_predictions, create_comparison_visualization
 from enhanced_visualizations import (
+    CUML_AVAILABLE,
     plot_audio_confidence_distribution,
     plot_lyrics_confidence_distribution,
     plot_audio_confidence_by_mood,
@@ -35,16 +51,40 @@ MODEL_DIR = BASE / "models"
 DATASET_PATH = DATA_DIR / "songs_mapped_20k_balanced.csv"
 MODEL_PATH = MODEL_DIR / "new_song_mood_model.joblib" 
 OUTPUT_PATH = DATA_DIR / "songs_with_predictions.csv"  
+# Typed columnar copy of the output, much faster to reload than the CSV
+PARQUET_OUTPUT_PATH = OUTPUT_PATH.with_suffix(".parquet")
 
 
-AUDIO_LOW_CONF_THRESHOLD = 0.35  
-AUDIO_BORDERLINE_MARGIN = 0.15
-LYRICS_LOW_CONF_THRESHOLD = 0.6  
+# Only deduplicate feature rows before scoring if it removes >10% of them
+DEDUP_MAX_UNIQUE_RATIO = 0.9
 
 
 TEST_MAX_SONGS = None 
 
 
+def read_dataset(path, nrows=None):
+    # pyarrow parses the CSV on all cores, fall back to the C engine without it
+    if not PYARROW_AVAILABLE:
+        return pd.read_csv(path, nrows=nrows)
+    if nrows is None:
+        return pd.read_csv(path, engine='pyarrow')
+    # The pyarrow engine has no nrows, so stream the CSV block by block and
+    # stop as soon as nrows rows are in
+    reader = pv.open_csv(
+        path,
+        read_options=pv.ReadOptions(block_size=1 << 20),
+        convert_options=pv.ConvertOptions(strings_can_be_null=True),
+    )
+    batches = []
+    n_read = 0
+    for batch in reader:
+        batches.append(batch)
+        n_read += batch.num_rows
+        if n_read >= nrows:
+            break
+    return pa.Table.from_batches(batches, schema=reader.schema).slice(0, nrows).to_pandas()
+
+
 def load_audio_model(model_path):
     
     print(f"Loading audio model from {model_path}...")
@@ -84,28 +124,31 @@ def get_audio_predictions(df, model_data):
         return None
     
 
-    X = df[available_features].copy()
-    
-    # Fill missing features with 0 
-    for feature in feature_names:
-        if feature not in X.columns:
-            X[feature] = 0 
-    
-  
-    X = X[feature_names]
-    
     # Get predictions and probabilities for uncertainty estimation
     try:
-      
-        predictions = pipeline.predict(X)
-        
-        proba = pipeline.predict_proba(X)
+        # Fill the feature matrix straight from the columns; missing
+        # features stay 0
+        X = np.zeros((len(df), len(feature_names)), dtype=np.float32)
+        for i, feature in enumerate(feature_names):
+            if feature in df.columns:
+                X[:, i] = df[feature].to_numpy(dtype=np.float32)
+
+        # Score each distinct feature row once and broadcast back, the same
+        # track often shows up several times in Spotify dumps
+        keys, inverse = np.unique(X, axis=0, return_inverse=True)
+        if len(keys) <= DEDUP_MAX_UNIQUE_RATIO * len(X):
+            proba = pipeline.predict_proba(keys)[inverse.reshape(-1)]
+        else:
+            proba = pipeline.predict_proba(X)
         classes = pipeline.classes_
 
-    
-        sorted_idx = np.argsort(proba, axis=1)
-        top1_idx = sorted_idx[:, -1]
-        top2_idx = sorted_idx[:, -2]
+        # Rank classes by probability; the stable sort keeps the first
+        # maximum on top, which is exactly what pipeline.predict returns,
+        # so predictions come from the one predict_proba pass
+        sorted_idx = np.argsort(-proba, axis=1, kind="stable")
+        top1_idx = sorted_idx[:, 0]
+        top2_idx = sorted_idx[:, 1]
+        predictions = classes[top1_idx]
 
         max_conf = proba[np.arange(len(proba)), top1_idx]
         second_conf = proba[np.arange(len(proba)), top2_idx]
@@ -122,6 +165,12 @@ def get_audio_predictions(df, model_data):
         second_conf = np.nan_to_num(second_conf, nan=0.0, posinf=1.0, neginf=0.0)
         margin = np.nan_to_num(margin, nan=0.0, posinf=1.0, neginf=0.0)
 
+        # float32 is plenty for thresholds at two decimals and halves the
+        # memory and file size of these columns
+        max_conf = max_conf.astype(np.float32, copy=False)
+        second_conf = second_conf.astype(np.float32, copy=False)
+        margin = margin.astype(np.float32, copy=False)
+
         print(f"Got {len(predictions)} audio predictions")
         return {
             "predictions": predictions,
@@ -135,6 +184,12 @@ def get_audio_predictions(df, model_data):
         return None
 
 
+@functools.lru_cache(maxsize=1)
+def _get_classifier():
+    # Building the classifier parses the VADER lexicon, so only do it once
+    return FreeLyricsClassifier()
+
+
 def get_lyrics_predictions(df, max_songs=None):
     print("\nGetting lyrics predictions using VADER")
     
@@ -157,7 +212,7 @@ def get_lyrics_predictions(df, max_songs=None):
     
 
     try:
-        classifier = FreeLyricsClassifier()
+        classifier = _get_classifier()
     except ImportError as e:
         print(f"ERROR: {e}")
         print("Please install VADER: pip install vaderSentiment")
@@ -171,14 +226,32 @@ def get_lyrics_predictions(df, max_songs=None):
     print("Using FREE VADER sentiment analysis  ")
     print()
     
-    df_with_predictions = classifier.classify_dataset(
-        df,
+    # Score each distinct lyric once and broadcast the results back, covers,
+    # remasters and missing lyrics repeat a lot
+    lyrics = df[lyrics_column].head(max_songs) if max_songs else df[lyrics_column]
+    codes, unique_lyrics = pd.factorize(lyrics, use_na_sentinel=False)
+    print(f"{len(unique_lyrics)} unique lyrics to classify")
+
+    unique_predictions = classifier.classify_dataset(
+        pd.DataFrame({lyrics_column: unique_lyrics}),
         lyrics_column=lyrics_column,
-        song_column='track_name' if 'track_name' in df.columns else None,
-        artist_column='artists' if 'artists' in df.columns else None,
-        max_songs=max_songs,
-        delay=0  
+        song_column=None,
+        artist_column=None,
+        delay=0
     )
+
+    # Rows past max_songs stay unclassified, same as classify_dataset
+    predictions = np.full(len(df), None, dtype=object)
+    # Confidences are already clamped to [0, 1] by the classifier
+    confidences = np.zeros(len(df), dtype=np.float32)
+    predictions[:len(lyrics)] = unique_predictions['lyrics_prediction'].to_numpy()[codes]
+    confidences[:len(lyrics)] = unique_predictions['lyrics_confidence'].to_numpy()[codes]
+
+    # Shallow copy: the new frame shares df's column data and only the two
+    # lyrics columns are new allocations
+    df_with_predictions = df.copy(deep=False)
+    df_with_predictions['lyrics_prediction'] = predictions
+    df_with_predictions['lyrics_confidence'] = confidences
     
     return df_with_predictions
 
@@ -196,10 +269,10 @@ def main():
     # TEST MODE Only read first N rows for quick testing
     if TEST_MAX_SONGS is not None:
         print(f"TEST MODE: Loading only first {TEST_MAX_SONGS} songs...")
-        df = pd.read_csv(DATASET_PATH, nrows=TEST_MAX_SONGS)
+        df = read_dataset(DATASET_PATH, nrows=TEST_MAX_SONGS)
         print(f"Loaded {len(df)} songs from dataset (TEST MODE)")
     else:
-        df = pd.read_csv(DATASET_PATH)
+        df = read_dataset(DATASET_PATH)
         print(f"Loaded {len(df)} songs from dataset")
     print(f"Columns: {list(df.columns)}")
     print()
@@ -226,21 +299,29 @@ def main():
         print(f"ERROR: Invalid audio_info structure. Missing keys: {missing_keys}")
         return
     
-    # Convert numpy arrays to proper types for CSV saving
-    df['audio_prediction'] = audio_info["predictions"].astype(str)
-    df['audio_confidence'] = audio_info["confidence"].astype(float)
-    df['audio_second_choice'] = audio_info["second_choice"].astype(str)
-    df['audio_second_confidence'] = audio_info["second_confidence"].astype(float)
-    df['audio_margin'] = audio_info["margin"].astype(float)
-
-    df['audio_low_confidence'] = df['audio_confidence'] < AUDIO_LOW_CONF_THRESHOLD
+    # Mood labels come from a tiny fixed vocabulary, so store them as
+    # categoricals. Audio and lyrics columns share one dtype so they can be
+    # compared directly
+    mood_dtype = pd.CategoricalDtype(
+        categories=list(dict.fromkeys([*TARGETS, *model_data['pipeline'].classes_]))
+    )
 
-    df['audio_borderline'] = df['audio_margin'] < AUDIO_BORDERLINE_MARGIN
+    # Convert numpy arrays to proper types for CSV saving
+    df['audio_prediction'] = pd.Categorical(audio_info["predictions"], dtype=mood_dtype)
+    df['audio_confidence'] = audio_info["confidence"].astype(np.float32)
+    df['audio_second_choice'] = pd.Categorical(audio_info["second_choice"], dtype=mood_dtype)
+    df['audio_second_confidence'] = audio_info["second_confidence"].astype(np.float32)
+    df['audio_margin'] = audio_info["margin"].astype(np.float32)
 
-    df['audio_top2_combo'] = df.apply(
-        lambda row: f"{row['audio_prediction']}|{row['audio_second_choice']}"
-        if row['audio_borderline'] else row['audio_prediction'],
-        axis=1,
+    # Uncertainty flags straight from the raw arrays, one pass each
+    predictions = audio_info["predictions"].astype(str)
+    borderline = audio_info["margin"] < AUDIO_BORDERLINE_MARGIN
+    df['audio_low_confidence'] = audio_info["confidence"] < AUDIO_LOW_CONF_THRESHOLD
+    df['audio_borderline'] = borderline
+    df['audio_top2_combo'] = np.where(
+        borderline,
+        np.char.add(np.char.add(predictions, "|"), audio_info["second_choice"].astype(str)),
+        predictions,
     )
     print("Audio predictions and uncertainty metrics added to dataset")
     print()
@@ -253,11 +334,14 @@ def main():
     if df_with_lyrics is None:
         print("ERROR: Could not get lyrics predictions.")
         return
-    
+    # Everything below works on df_with_lyrics, don't keep the old frame alive
+    del df
+
+    df_with_lyrics['lyrics_prediction'] = df_with_lyrics['lyrics_prediction'].astype(mood_dtype)
 
     if 'lyrics_confidence' in df_with_lyrics.columns:
         df_with_lyrics['lyrics_low_confidence'] = (
-            df_with_lyrics['lyrics_confidence'] < LYRICS_LOW_CONF_THRESHOLD
+            df_with_lyrics['lyrics_confidence'].to_numpy() < LYRICS_LOW_CONF_THRESHOLD
         )
     
     # Compare predictions
@@ -308,7 +392,8 @@ def main():
     plot_mood_map(df=None, method='pca', n_samples=10000,
                   save_path=str(BASE / "figures" / "mood_map_pca.png"))
     print("t-SNE")
-    plot_mood_map(df=None, method='tsne', n_samples=3000,
+    # GPU t-SNE is cheap enough to embed far more songs
+    plot_mood_map(df=None, method='tsne', n_samples=20000 if CUML_AVAILABLE else 3000,
                   save_path=str(BASE / "figures" / "mood_map_tsne.png"))
     
     print("Audio vs lyrics comparisons")
@@ -327,24 +412,6 @@ def main():
     print("\nSaving results.")
     OUTPUT_PATH.parent.mkdir(parents=True, exist_ok=True)
     
-    # Ensure all prediction columns are strings and confidence columns are floats before saving
-    if 'audio_prediction' in df_with_lyrics.columns:
-        df_with_lyrics['audio_prediction'] = df_with_lyrics['audio_prediction'].astype(str)
-        # Replace 'nan' strings with actual NaN
-        df_with_lyrics['audio_prediction'] = df_with_lyrics['audio_prediction'].replace('nan', pd.NA)
-    if 'lyrics_prediction' in df_with_lyrics.columns:
-        df_with_lyrics['lyrics_prediction'] = df_with_lyrics['lyrics_prediction'].astype(str)
-        # Replace 'nan' strings with actual NaN
-        df_with_lyrics['lyrics_prediction'] = df_with_lyrics['lyrics_prediction'].replace('nan', pd.NA)
-    if 'audio_confidence' in df_with_lyrics.columns:
-        df_with_lyrics['audio_confidence'] = pd.to_numeric(df_with_lyrics['audio_confidence'], errors='coerce')
-        # Ensure confidence is in valid range [0, 1]
-        df_with_lyrics['audio_confidence'] = df_with_lyrics['audio_confidence'].clip(0, 1)
-    if 'lyrics_confidence' in df_with_lyrics.columns:
-        df_with_lyrics['lyrics_confidence'] = pd.to_numeric(df_with_lyrics['lyrics_confidence'], errors='coerce')
-        # Ensure confidence is in valid range [0, 1]
-        df_with_lyrics['lyrics_confidence'] = df_with_lyrics['lyrics_confidence'].clip(0, 1)
-    
     # Validate required columns exist before saving
     required_cols = ['audio_prediction', 'lyrics_prediction']
     missing_cols = [col for col in required_cols if col not in df_with_lyrics.columns]
@@ -360,6 +427,12 @@ def main():
     
     df_with_lyrics.to_csv(OUTPUT_PATH, index=False)
     print(f"Saved {len(df_with_lyrics)} rows to {OUTPUT_PATH}")
+    try:
+        df_with_lyrics.to_parquet(PARQUET_OUTPUT_PATH, engine='pyarrow', compression='zstd', index=False)
+        print(f"Saved {len(df_with_lyrics)} rows to {PARQUET_OUTPUT_PATH}")
+    except ImportError as e:
+        print(f"WARNING: Could not save parquet copy: {e}")
+        print("Please install pyarrow: pip install pyarrow")
     print(f"  Columns saved: {len(df_with_lyrics.columns)}")
     print(f"  Required columns present: {all(col in df_with_lyrics.columns for col in required_cols)}")
 
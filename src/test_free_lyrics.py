@@ -1,12 +1,31 @@
+import numpy as np
 import pandas as pd
 import sys
+import warnings
 from pathlib import Path
 import joblib
 
+# pyarrow streams only the needed columns and rows; plain pandas is used without it
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pv
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# Numba compiles the agreement scan; plain numpy is used when it is missing
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
 # Import our modules
 sys.path.append(str(Path(__file__).parent))
 from lyrics_classifier_free import FreeLyricsClassifier
 from compare_audio_lyrics import compare_predictions
+from audio_data import TARGETS
 
 # Setup paths
 BASE = Path(__file__).resolve().parents[1]
@@ -14,7 +33,72 @@ DATA_DIR = BASE / "data" / "processed"
 MODEL_DIR = BASE / "models"
 
 DATASET_PATH = DATA_DIR / "songs_mapped.csv"
+# written by csv_to_parquet.py, read instead of the CSV when it exists
+DATASET_PARQUET = DATASET_PATH.with_suffix(".parquet")
 MODEL_PATH = MODEL_DIR / "new_song_mood_model.joblib"
+# VADER scores from earlier runs, keyed by a hash of the lyrics
+VADER_CACHE_PATH = DATA_DIR / "vader_cache.parquet"
+
+# Non-feature columns the test uses, under both naming schemes
+TEXT_COLUMNS = ['text', 'mood', 'track_name', 'artists', 'song', 'Artist(s)']
+
+
+def load_dataset(path, nrows, columns):
+    # Stream the file with pyarrow, reading only the columns we use and only
+    # the blocks needed for the first nrows rows
+    if not PYARROW_AVAILABLE:
+        return pd.read_csv(path, usecols=lambda c: c in set(columns), nrows=nrows)
+    if path.suffix == '.parquet':
+        parquet_file = pq.ParquetFile(path)
+        include = [c for c in parquet_file.schema_arrow.names if c in set(columns)]
+        schema = pa.schema([parquet_file.schema_arrow.field(c) for c in include])
+        reader = parquet_file.iter_batches(batch_size=64 * 1024, columns=include)
+    else:
+        header = pv.open_csv(path).schema.names
+        include = [c for c in header if c in set(columns)]
+        reader = pv.open_csv(
+            path,
+            read_options=pv.ReadOptions(block_size=1 << 20),
+            convert_options=pv.ConvertOptions(include_columns=include, strings_can_be_null=True),
+        )
+        schema = reader.schema
+    batches = []
+    n_read = 0
+    for batch in reader:
+        batches.append(batch)
+        n_read += batch.num_rows
+        if n_read >= nrows:
+            break
+    table = pa.Table.from_batches(batches, schema=schema).slice(0, nrows)
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+
+def _agreement_scan(a, b):
+    n = 0
+    for i in range(a.size):
+        if a[i] == b[i]:
+            n += 1
+    return n
+
+if NUMBA_AVAILABLE:
+    _agreement_scan = njit(cache=True)(_agreement_scan)
+
+
+def count_agreement(audio_preds, lyrics_preds):
+    # Compare int8 mood codes; columns sharing a categorical dtype already
+    # have them, anything else is encoded against the same codes first
+    if isinstance(audio_preds.dtype, pd.CategoricalDtype) and audio_preds.dtype == lyrics_preds.dtype:
+        a = audio_preds.cat.codes.to_numpy(np.int8)
+        b = lyrics_preds.cat.codes.to_numpy(np.int8)
+    else:
+        codes, _ = pd.factorize(np.concatenate([np.asarray(audio_preds, dtype=object),
+                                                np.asarray(lyrics_preds, dtype=object)]))
+        codes = codes.astype(np.int8)
+        a, b = codes[:len(audio_preds)], codes[len(audio_preds):]
+    if NUMBA_AVAILABLE:
+        return int(_agreement_scan(a, b))
+    return int(np.count_nonzero(a == b))
+
 
 def load_audio_model(model_path):
 
@@ -38,19 +122,17 @@ def get_audio_predictions(df, model_data):
     pipeline = model_data['pipeline']
     feature_names = model_data['features']
     
-    # Get features that exist in dataset
-    available_features = [f for f in feature_names if f in df.columns]
-    X = df[available_features].copy()
+    # Model features in training order, missing ones filled with 0, in one allocation.
+    # A C-contiguous float32 block lets sklearn's check_array pass it through as is
+    X = df.reindex(columns=feature_names, fill_value=0).to_numpy(dtype=np.float32, na_value=np.nan)
+    X = np.ascontiguousarray(X)
     
-    for feature in feature_names:
-        if feature not in X.columns:
-            X[feature] = 0
-    
-    X = X[feature_names]
-    
-    # Get predictions
+    # Get predictions. X is a bare array already in the fitted column order,
+    # so sklearn's feature names warning has nothing to tell us
     try:
-        predictions = pipeline.predict(X)
+        with warnings.catch_warnings():
+            warnings.filterwarnings("ignore", message="X does not have valid feature names")
+            predictions = pipeline.predict(X)
         print(f" Got {len(predictions)} audio predictions")
         return predictions
     except Exception as e:
@@ -59,10 +141,16 @@ def get_audio_predictions(df, model_data):
 
 def main():
     
+    # Load the model first so only its features need to be read from the CSV
+    model_data = load_audio_model(MODEL_PATH)
+    if model_data is None:
+        return
+    
     # Load dataset
     print("Loading dataset...")
     TEST_SONGS = 100 
-    df = pd.read_csv(DATASET_PATH, nrows=TEST_SONGS)
+    dataset_path = DATASET_PARQUET if DATASET_PARQUET.exists() and PYARROW_AVAILABLE else DATASET_PATH
+    df = load_dataset(dataset_path, TEST_SONGS, model_data['features'] + TEXT_COLUMNS)
     print(f"Loaded {len(df)} songs for testing")
     print()
     
@@ -78,10 +166,6 @@ def main():
     
     #get audio predictions
     print("Getting audio predictions...")
-    model_data = load_audio_model(MODEL_PATH)
-    if model_data is None:
-        return
-    
     audio_predictions = get_audio_predictions(df, model_data)
     if audio_predictions is None:
         return
@@ -108,7 +192,9 @@ def main():
         song_column='track_name' if 'track_name' in df.columns else 'song',
         artist_column='artists' if 'artists' in df.columns else 'Artist(s)',
         max_songs=TEST_SONGS,
-        delay=0  
+        delay=0,
+        n_jobs=-1,  # score lyrics on all cores
+        cache_path=VADER_CACHE_PATH if PYARROW_AVAILABLE else None  # the cache is a parquet file
     )
     
     if df_with_lyrics is None:
@@ -129,9 +215,16 @@ def main():
     
     print(f"Comparing {len(df_compare)} songs...")
     print()
+
+    # One shared categorical dtype for the label columns, so agreement and
+    # accuracy compare small integer codes instead of python strings
+    mood_columns = [c for c in ('mood', 'audio_prediction', 'lyrics_prediction') if c in df_compare.columns]
+    seen = [str(v) for c in mood_columns for v in df_compare[c].dropna().unique()]
+    mood_dtype = pd.CategoricalDtype(categories=list(dict.fromkeys(TARGETS + seen)))
+    df_compare = df_compare.astype({c: mood_dtype for c in mood_columns})
     
     # Calculate agreement
-    agreement = (df_compare['audio_prediction'] == df_compare['lyrics_prediction']).sum()
+    agreement = count_agreement(df_compare['audio_prediction'], df_compare['lyrics_prediction'])
     agreement_pct = (agreement / len(df_compare)) * 100
     
 
@@ -143,11 +236,13 @@ def main():
 
     print("Sample predictions:")
     print()
-    for idx, row in df_compare.head(10).iterrows():
-        song_name = row.get('track_name', row.get('song', 'Unknown'))[:30]
-        audio_pred = row['audio_prediction']
-        lyrics_pred = row['lyrics_prediction']
-        true_label = row.get('mood', 'Unknown')
+    name_column = 'track_name' if 'track_name' in df_compare.columns else 'song'
+    # one object array for the printout, rows are plain tuples rather than Series
+    sample = df_compare.head(10).reindex(
+        columns=[name_column, 'audio_prediction', 'lyrics_prediction', 'mood'], fill_value='Unknown'
+    ).to_numpy(dtype=object)
+    for song_name, audio_pred, lyrics_pred, true_label in sample:
+        song_name = song_name[:30]
         
         match = "good" if audio_pred == lyrics_pred else "Bad"
         print(f"{match} {song_name:30s} | Audio: {audio_pred:6s} | Lyrics: {lyrics_pred:6s} | True: {true_label}")
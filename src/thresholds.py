@@ -0,0 +1,7 @@
+# src/thresholds.py
+# Uncertainty thresholds shared by the prediction, plotting and API scripts
+# so they all flag the same songs as low-confidence
+
+AUDIO_LOW_CONF_THRESHOLD = 0.4
+AUDIO_BORDERLINE_MARGIN = 0.15
+LYRICS_LOW_CONF_THRESHOLD = 0.6
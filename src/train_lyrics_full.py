@@ -1,14 +1,26 @@
+import numpy as np
 import pandas as pd
 import sys
+import argparse
+import warnings
 from pathlib import Path
 import joblib
 import time
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+# pyarrow writes the results as parquet; without it they are saved as CSV only
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
 
 # Import our modules
 sys.path.append(str(Path(__file__).parent))
 from lyrics_classifier_free import FreeLyricsClassifier
-from compare_audio_lyrics import compare_predictions, create_comparison_visualization
+from compare_audio_lyrics import compare_predictions
 
 # Setup paths
 BASE = Path(__file__).resolve().parents[1]
@@ -17,7 +29,59 @@ MODEL_DIR = BASE / "models"
 
 DATASET_PATH = DATA_DIR / "songs_mapped.csv"
 MODEL_PATH = MODEL_DIR / "new_song_mood_model.joblib"
-OUTPUT_PATH = DATA_DIR / "audio_lyrics_comparison_full.csv"
+OUTPUT_PATH = DATA_DIR / "audio_lyrics_comparison_full.parquet"
+# only written with --csv (or without pyarrow), for tools that need the old CSV
+OUTPUT_CSV_PATH = OUTPUT_PATH.with_suffix(".csv")
+
+# Model loads and audio predictions are cached here between runs, keyed by the
+# model file's mtime and the feature values (not .cache, that's the spotify token file)
+MEMORY = joblib.Memory(BASE / ".joblib_cache", mmap_mode="r", verbose=0)
+
+# Non-feature columns used here, under both naming schemes
+TEXT_COLUMNS = ['text', 'mood', 'track_name', 'artists', 'song', 'Artist(s)']
+# Written to the parquet output as strings whatever the first chunk holds
+# (a column that is all missing there would otherwise be typed null)
+STRING_COLUMNS = set(TEXT_COLUMNS) | {'audio_prediction', 'lyrics_prediction'}
+
+# Songs per chunk, the next chunk is parsed while the current one is scored
+CHUNK_SIZE = 10_000
+
+def iter_dataset(path, nrows, columns, dtype=None, chunksize=CHUNK_SIZE):
+    # Read only the columns we use (and only nrows rows when given), chunk by chunk,
+    # with known dtypes so the parser doesn't have to infer them.
+    # One background thread keeps the reader a chunk ahead of the caller
+    header = pd.read_csv(path, nrows=0).columns
+    usecols = [c for c in header if c in set(columns)]
+    dtype = {c: t for c, t in (dtype or {}).items() if c in usecols}
+    reader = pd.read_csv(path, usecols=usecols, dtype=dtype, nrows=nrows,
+                         chunksize=chunksize, engine='c')
+    with reader, ThreadPoolExecutor(max_workers=1) as prefetch:
+        pending = prefetch.submit(next, reader, None)
+        while True:
+            chunk = pending.result()
+            if chunk is None:
+                break
+            pending = prefetch.submit(next, reader, None)
+            yield chunk
+
+@MEMORY.cache
+def _load_model_file(model_path, mtime):
+    # mtime is only part of the cache key, so retraining invalidates the entry.
+    # The model's arrays come back memory-mapped, both on cache hits and on the
+    # first load (train_audio_model.py saves uncompressed). An older compressed
+    # model file can't be mapped and joblib just reads it normally
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", message="mmap_mode .* not compatible with compressed file")
+        return joblib.load(model_path, mmap_mode="r")
+
+@MEMORY.cache(ignore=["pipeline"])
+def _predict(pipeline, model_key, X):
+    # model_key = (path, mtime) stands in for the pipeline in the cache key.
+    # X is a bare array already in the fitted column order, so sklearn's
+    # feature names warning has nothing to tell us
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", message="X does not have valid feature names")
+        return pipeline.predict(X)
 
 def load_audio_model(model_path):
     print(f"Loading audio model from {model_path}...")
@@ -26,7 +90,9 @@ def load_audio_model(model_path):
         return None
     
     try:
-        model_data = joblib.load(model_path)
+        model_key = (str(model_path), model_path.stat().st_mtime)
+        model_data = dict(_load_model_file(*model_key))
+        model_data['cache_key'] = model_key
         print(" Audio model loaded successfully!")
         return model_data
     except Exception as e:
@@ -40,109 +106,165 @@ def get_audio_predictions(df, model_data):
     pipeline = model_data['pipeline']
     feature_names = model_data['features']
     
-    # Get features that exist in dataset
-    available_features = [f for f in feature_names if f in df.columns]
-    X = df[available_features].copy()
-   
-    for feature in feature_names:
-        if feature not in X.columns:
-            X[feature] = 0
-    
-    X = X[feature_names]
+    # Model features in training order, missing ones filled with 0, in one allocation
+    X = df.reindex(columns=feature_names, fill_value=0)
+
+    # One contiguous float32 block for the pipeline: half the bytes through
+    # the scaler/model, and a cheaper hash for the prediction cache key
+    X = np.ascontiguousarray(X.to_numpy(dtype=np.float32))
     
     # Get predictions
     try:
-        predictions = pipeline.predict(X)
+        predictions = _predict(pipeline, model_data['cache_key'], X)
         print(f" Got {len(predictions)} audio predictions")
         return predictions
     except Exception as e:
         print(f"ERROR getting predictions: {e}")
         return None
 
-def main():
+def score_chunk(chunk, model_data, classifier, lyrics_column):
+    # Both models score the same chunk back to back and their columns are added
+    # in a single assign, rather than classify_dataset copying the chunk again.
+    # Lyrics go first, the audio model only runs once they are scored
+
+    # VADER is deterministic, so each distinct lyric (covers, remixes, placeholder
+    # text...) is scored once and the results are taken back out per row
+    codes, unique_texts = pd.factorize(chunk[lyrics_column])
+    unique_texts = np.asarray(unique_texts, dtype=object)
+    moods, confidences = classifier.classify_batch(unique_texts, n_jobs=-1)  # score lyrics on all cores
+    lyrics_predictions = moods[codes]
+    lyrics_confidences = confidences[codes]
+    print(f" Got {len(lyrics_predictions)} lyrics predictions ({len(unique_texts)} unique lyrics)")
+
+    audio_predictions = get_audio_predictions(chunk, model_data)
+    if audio_predictions is None:
+        return None
+
+    return chunk.assign(
+        audio_prediction=audio_predictions,
+        lyrics_prediction=lyrics_predictions,
+        lyrics_confidence=lyrics_confidences,
+    )
+
+def output_schema(table):
+    return pa.schema([pa.field(f.name, pa.string()) if f.name in STRING_COLUMNS else f
+                      for f in table.schema])
 
+def main(write_csv=False):
+
+    pd.set_option('mode.copy_on_write', True)
+    write_csv = write_csv or not PYARROW_AVAILABLE
     
     start_time = time.time()
     print(f"Start time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print()
     
+    # Load the model first so only its features need to be read from the CSV
+    print("Loading Nadine's audio model...")
+    model_data = load_audio_model(MODEL_PATH)
+    if model_data is None:
+        return
+    needed_columns = model_data['features'] + TEXT_COLUMNS
+    # float32 is what the model is fed anyway, and half the memory of float64
+    column_dtypes = {c: 'float32' for c in model_data['features']}
+    column_dtypes['text'] = 'string'
+
+    # Initialize  classifier
+    try:
+        classifier = FreeLyricsClassifier()
+    except ImportError:
+        print("ERROR: VADER not installed!")
+        return
+
     # Load dataset
     print(" Loading dataset...")
 
     MAX_SONGS = 5000  # Process 5000 songs (can increase if you want more)
     
     if MAX_SONGS:
-        print(f"Loading {MAX_SONGS:,} songs...")
-        df = pd.read_csv(DATASET_PATH, nrows=MAX_SONGS)
+        print(f"Loading {MAX_SONGS:,} songs in chunks of {CHUNK_SIZE:,}...")
     else:
-        print("Loading entire dataset (this may take a while)...")
-        df = pd.read_csv(DATASET_PATH)
-    
-    print(f"Loaded {len(df):,} songs")
+        print(f"Loading entire dataset in chunks of {CHUNK_SIZE:,} (this may take a while)...")
     print()
-    
-    # Check lyrics column
+
     lyrics_column = 'text'
-    if lyrics_column not in df.columns:
-        print(" ERROR: Lyrics column not found!")
-        return
-    
-    
-    df = df[df[lyrics_column].notna()].copy()
-    print(f"Songs with lyrics: {len(df):,}")
-    print()
-    
-    # Get audio predictions
-    print("Getting audio predictions from Nadine's model...")
-    model_data = load_audio_model(MODEL_PATH)
-    if model_data is None:
-        return
-    
-    audio_predictions = get_audio_predictions(df, model_data)
-    if audio_predictions is None:
-        return
-    
-    df['audio_prediction'] = audio_predictions
-    print("Audio predictions added")
-    print()
-    
-    # Get lyrics predictions 
-  
-    print(f"Processing {len(df):,} songs...")
+    n_loaded = 0
+    n_lyrics = 0
+    n_compared = 0
+    compared = []
+    writer = None
+    OUTPUT_PATH.parent.mkdir(parents=True, exist_ok=True)
 
-    
-    # Initialize  classifier
+    # Audio + lyrics predictions chunk by chunk, while the next chunk is being read.
+    # Each scored chunk is written out straight away and only its mood labels are
+    # kept for the comparison, so the lyrics never pile up in memory
     try:
-        classifier = FreeLyricsClassifier()
-    except ImportError:
-        print("ERROR: VADER not installed!")
-        return
+        for chunk in iter_dataset(DATASET_PATH, MAX_SONGS or None, needed_columns, column_dtypes):
+            n_loaded += len(chunk)
+
+            # Check lyrics column
+            if lyrics_column not in chunk.columns:
+                print(" ERROR: Lyrics column not found!")
+                return
+
+            # Songs without lyrics are dropped here, before either model sees them.
+            # copy-on-write: the filtered frame shares its data and only the columns
+            # assigned later get copied, so no upfront .copy() of the whole thing
+            chunk = chunk.loc[chunk[lyrics_column].notna()]
+            n_lyrics += len(chunk)
+            # a block of songs with no lyrics at all has nothing to score
+            if chunk.empty:
+                continue
+
+            # Get audio + lyrics predictions 
+            print(f"Processing {len(chunk):,} songs...")
+            chunk_with_lyrics = score_chunk(chunk, model_data, classifier, lyrics_column)
+            if chunk_with_lyrics is None:
+                return
+
+            # Save results
+            # Parquet is encoded column by column in C++, far faster (and smaller) than to_csv.
+            # Every chunk is cast to one schema with the name and label columns as strings
+            if PYARROW_AVAILABLE:
+                table = pa.Table.from_pandas(chunk_with_lyrics, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(OUTPUT_PATH, output_schema(table), compression='zstd')
+                writer.write_table(table.cast(writer.schema))
+            if write_csv:
+                chunk_with_lyrics.to_csv(OUTPUT_CSV_PATH, mode='a' if n_compared else 'w',
+                                         header=not n_compared, index=False)
+
+            # No dropna needed: predict() labels every row, and classify_batch gives
+            # songs without usable lyrics 'chill' rather than a missing value.
+            # A real copy, so the labels don't keep the chunk's text block alive
+            label_columns = [c for c in ('mood', 'audio_prediction', 'lyrics_prediction')
+                             if c in chunk_with_lyrics.columns]
+            compared.append(chunk_with_lyrics[label_columns].copy())
+            n_compared += len(chunk_with_lyrics)
+            print()
+    finally:
+        if writer is not None:
+            writer.close()
     
-    # Classify songs 
-    df_with_lyrics = classifier.classify_dataset(
-        df,
-        lyrics_column=lyrics_column,
-        song_column='track_name' if 'track_name' in df.columns else 'song',
-        artist_column='artists' if 'artists' in df.columns else 'Artist(s)',
-        max_songs=None,  
-        delay=0  
-    )
+    print(f"Loaded {n_loaded:,} songs")
+    print(f"Songs with lyrics: {n_lyrics:,}")
+    print()
     
-    if df_with_lyrics is None:
-        print(" ERROR: Could not get lyrics predictions")
+    if n_compared == 0:
+        print("ERROR: No songs with both predictions!")
         return
-    
+
+    if PYARROW_AVAILABLE:
+        print(f"Results saved to: {OUTPUT_PATH}")
+    if write_csv:
+        print(f"Results saved to: {OUTPUT_CSV_PATH}")
     print()
     
     # Compare results
     print("Comparing predictions...")
     print()
     
-    df_compare = df_with_lyrics.dropna(subset=['audio_prediction', 'lyrics_prediction'])
-    
-    if len(df_compare) == 0:
-        print("ERROR: No songs with both predictions!")
-        return
+    df_compare = pd.concat(compared, ignore_index=True)
     
     print(f"Comparing {len(df_compare):,} songs...")
     print()
@@ -158,6 +280,8 @@ def main():
     # Create visualization
     print("\nCreating visualization...")
     try:
+        # imported here so matplotlib is only loaded once we actually plot
+        from compare_audio_lyrics import create_comparison_visualization
         create_comparison_visualization(
             df_compare,
             audio_pred_col='audio_prediction',
@@ -167,11 +291,6 @@ def main():
     except Exception as e:
         print(f"Warning: Could not create visualization: {e}")
     
-    # Save results
-    print("\n Saving results...")
-    OUTPUT_PATH.parent.mkdir(parents=True, exist_ok=True)
-    df_compare.to_csv(OUTPUT_PATH, index=False)
-    print(f"Results saved to: {OUTPUT_PATH}")
     print()
     
     # Calculate time
@@ -187,11 +306,14 @@ def main():
         print(f"Audio accuracy: {results['audio_accuracy']*100:.1f}%")
         print(f"Lyrics accuracy: {results['lyrics_accuracy']*100:.1f}%")
     
-    print(f"Results saved to: {OUTPUT_PATH}")
+    print(f"Results saved to: {OUTPUT_PATH if PYARROW_AVAILABLE else OUTPUT_CSV_PATH}")
     print(f"Visualization saved to: audio_lyrics_comparison_full.png")
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--csv', action='store_true', help="also save the results as CSV")
+    args = parser.parse_args()
+    main(write_csv=args.csv)
 
 
@@ -0,0 +1,315 @@
+# src/vader_numba.py
+# VADER compound scores with the per-token rules compiled by Numba.
+# Tokenizing stays in python and follows vaderSentiment exactly (emoji
+# replacement, whitespace split, punctuation strip); every token is then
+# mapped to an int32 id so booster/negation/idiom/"but" rules run over arrays.
+# Scores match SentimentIntensityAnalyzer.polarity_scores(text)['compound'].
+import math
+import string
+import sys
+
+import numpy as np
+from numba import njit, prange
+from vaderSentiment.vaderSentiment import BOOSTER_DICT, C_INCR, N_SCALAR, NEGATE, SPECIAL_CASES
+
+# codes for the words the rules look for by name
+W_OTHER, W_NO, W_KIND, W_OF, W_BUT, W_LEAST, W_AT, W_VERY = 0, 1, 2, 3, 4, 5, 6, 7
+W_NEVER, W_SO, W_THIS, W_WITHOUT, W_DOUBT, W_OR, W_NOR = 8, 9, 10, 11, 12, 13, 14
+WORD_CODES = {
+    "no": W_NO, "kind": W_KIND, "of": W_OF, "but": W_BUT, "least": W_LEAST,
+    "at": W_AT, "very": W_VERY, "never": W_NEVER, "so": W_SO, "this": W_THIS,
+    "without": W_WITHOUT, "doubt": W_DOUBT, "or": W_OR, "nor": W_NOR,
+}
+
+# python >= 3.12 sums floats with Neumaier compensation, VADER's sum(sentiments) included
+COMPENSATED_SUM = sys.version_info >= (3, 12)
+
+
+@njit(cache=True)
+def _match(w, start, length, phrase_ids, phrase_len):
+    # index of the phrase equal to w[start:start+length], -1 if none
+    for p in range(phrase_len.size):
+        if phrase_len[p] != length:
+            continue
+        ok = True
+        for k in range(length):
+            if phrase_ids[p, k] != w[start + k]:
+                ok = False
+                break
+        if ok:
+            return p
+    return -1
+
+
+@njit(cache=True)
+def _special_idioms(valence, w, i, n, sp_ids, sp_len, sp_val, bo_ids, bo_len, bo_val):
+    # same lookup order as SentimentIntensityAnalyzer._special_idioms_check
+    j = _match(w, i - 1, 2, sp_ids, sp_len)
+    if j < 0:
+        j = _match(w, i - 2, 3, sp_ids, sp_len)
+    if j < 0:
+        j = _match(w, i - 2, 2, sp_ids, sp_len)
+    if j < 0:
+        j = _match(w, i - 3, 3, sp_ids, sp_len)
+    if j < 0:
+        j = _match(w, i - 3, 2, sp_ids, sp_len)
+    if j >= 0:
+        valence = sp_val[j]
+    if n - 1 > i:
+        j = _match(w, i, 2, sp_ids, sp_len)
+        if j >= 0:
+            valence = sp_val[j]
+    if n - 1 > i + 1:
+        j = _match(w, i, 3, sp_ids, sp_len)
+        if j >= 0:
+            valence = sp_val[j]
+
+    j = _match(w, i - 3, 3, bo_ids, bo_len)
+    if j >= 0:
+        valence = valence + bo_val[j]
+    j = _match(w, i - 3, 2, bo_ids, bo_len)
+    if j >= 0:
+        valence = valence + bo_val[j]
+    j = _match(w, i - 2, 2, bo_ids, bo_len)
+    if j >= 0:
+        valence = valence + bo_val[j]
+    return valence
+
+
+@njit(cache=True)
+def _score_doc(w, up, is_cap_diff, punct, compensated, lex, in_lex, booster, is_booster,
+               negated, code, sp_ids, sp_len, sp_val, bo_ids, bo_len, bo_val):
+    n = w.size
+    if n == 0:
+        return 0.0
+
+    sent = np.zeros(n)
+    for i in range(n):
+        t = w[i]
+        if is_booster[t]:
+            continue
+        if i < n - 1 and code[t] == W_KIND and code[w[i + 1]] == W_OF:
+            continue
+        if not in_lex[t]:
+            continue
+
+        valence = lex[t]
+        # "no" right before another lexicon word only negates it
+        if code[t] == W_NO and i != n - 1 and in_lex[w[i + 1]]:
+            valence = 0.0
+        if (i > 0 and code[w[i - 1]] == W_NO) or (i > 1 and code[w[i - 2]] == W_NO) or \
+           (i > 2 and code[w[i - 3]] == W_NO and (code[w[i - 1]] == W_OR or code[w[i - 1]] == W_NOR)):
+            valence = lex[t] * N_SCALAR
+
+        if up[i] and is_cap_diff:
+            if valence > 0:
+                valence += C_INCR
+            else:
+                valence -= C_INCR
+
+        for start_i in range(3):
+            p = i - (start_i + 1)
+            if i > start_i and not in_lex[w[p]]:
+                s = 0.0
+                if is_booster[w[p]]:
+                    s = booster[w[p]]
+                    if valence < 0:
+                        s *= -1
+                    if up[p] and is_cap_diff:
+                        if valence > 0:
+                            s += C_INCR
+                        else:
+                            s -= C_INCR
+                if start_i == 1 and s != 0:
+                    s = s * 0.95
+                if start_i == 2 and s != 0:
+                    s = s * 0.9
+                valence = valence + s
+
+                if start_i == 0:
+                    if negated[w[i - 1]]:
+                        valence = valence * N_SCALAR
+                elif start_i == 1:
+                    if code[w[i - 2]] == W_NEVER and (code[w[i - 1]] == W_SO or code[w[i - 1]] == W_THIS):
+                        valence = valence * 1.25
+                    elif code[w[i - 2]] == W_WITHOUT and code[w[i - 1]] == W_DOUBT:
+                        pass
+                    elif negated[w[i - 2]]:
+                        valence = valence * N_SCALAR
+                else:
+                    if (code[w[i - 3]] == W_NEVER and (code[w[i - 2]] == W_SO or code[w[i - 2]] == W_THIS)) or \
+                       (code[w[i - 1]] == W_SO or code[w[i - 1]] == W_THIS):
+                        valence = valence * 1.25
+                    elif code[w[i - 3]] == W_WITHOUT and (code[w[i - 2]] == W_DOUBT or code[w[i - 1]] == W_DOUBT):
+                        pass
+                    elif negated[w[i - 3]]:
+                        valence = valence * N_SCALAR
+                    valence = _special_idioms(valence, w, i, n, sp_ids, sp_len, sp_val, bo_ids, bo_len, bo_val)
+
+        if i > 1 and not in_lex[w[i - 1]] and code[w[i - 1]] == W_LEAST:
+            if code[w[i - 2]] != W_AT and code[w[i - 2]] != W_VERY:
+                valence = valence * N_SCALAR
+        elif i > 0 and not in_lex[w[i - 1]] and code[w[i - 1]] == W_LEAST:
+            valence = valence * N_SCALAR
+        sent[i] = valence
+
+    # contrastive "but", including VADER's list.index quirk of always
+    # rescaling the first equal value
+    bi = -1
+    for i in range(n):
+        if code[w[i]] == W_BUT:
+            bi = i
+            break
+    if bi >= 0:
+        for k in range(n):
+            v = sent[k]
+            si = 0
+            while sent[si] != v:
+                si += 1
+            if si < bi:
+                sent[si] = v * 0.5
+            elif si > bi:
+                sent[si] = v * 1.5
+
+    total = 0.0
+    comp = 0.0
+    for i in range(n):
+        x = sent[i]
+        if compensated:
+            t_sum = total + x
+            if abs(total) >= abs(x):
+                comp += (total - t_sum) + x
+            else:
+                comp += (x - t_sum) + total
+            total = t_sum
+        else:
+            total += x
+    if compensated and comp != 0.0 and math.isfinite(comp):
+        total += comp
+
+    if total > 0:
+        total += punct
+    elif total < 0:
+        total -= punct
+
+    score = total / math.sqrt((total * total) + 15)
+    if score < -1.0:
+        return -1.0
+    if score > 1.0:
+        return 1.0
+    return score
+
+
+@njit(parallel=True, cache=True)
+def _score_docs(ids, upper, offsets, cap_diff, punct, compensated, lex, in_lex, booster, is_booster,
+                negated, code, sp_ids, sp_len, sp_val, bo_ids, bo_len, bo_val):
+    n_docs = offsets.size - 1
+    out = np.empty(n_docs)
+    for d in prange(n_docs):
+        a, b = offsets[d], offsets[d + 1]
+        out[d] = _score_doc(ids[a:b], upper[a:b], cap_diff[d], punct[d], compensated,
+                            lex, in_lex, booster, is_booster, negated, code,
+                            sp_ids, sp_len, sp_val, bo_ids, bo_len, bo_val)
+    return out
+
+
+def _strip_punc_if_word(token):
+    stripped = token.strip(string.punctuation)
+    if len(stripped) <= 2:
+        return token
+    return stripped
+
+
+class NumbaVader:
+
+    def __init__(self, analyzer):
+        self.lexicon = analyzer.lexicon
+        # polarity_scores only ever swaps single characters for their descriptions
+        # (all non-ascii, so plain ascii lyrics skip the check entirely)
+        self.emojis = {k: v for k, v in analyzer.emojis.items() if len(k) == 1}
+
+        # token id -> attributes, grown as new lowercase tokens show up
+        self.vocab = {}
+        self._lex, self._in_lex, self._booster, self._is_booster = [], [], [], []
+        self._negated, self._code = [], []
+
+        self.sp_ids, self.sp_len, self.sp_val = self._phrase_table(
+            {k: v for k, v in SPECIAL_CASES.items() if " " in k})
+        self.bo_ids, self.bo_len, self.bo_val = self._phrase_table(
+            {k: v for k, v in BOOSTER_DICT.items() if " " in k})
+
+    def _token_id(self, word):
+        tid = self.vocab.get(word)
+        if tid is None:
+            tid = len(self.vocab)
+            self.vocab[word] = tid
+            self._lex.append(self.lexicon.get(word, 0.0))
+            self._in_lex.append(word in self.lexicon)
+            self._booster.append(BOOSTER_DICT.get(word, 0.0))
+            self._is_booster.append(word in BOOSTER_DICT)
+            self._negated.append(word in NEGATE or "n't" in word)
+            self._code.append(WORD_CODES.get(word, W_OTHER))
+        return tid
+
+    def _phrase_table(self, phrases):
+        ids = np.full((max(len(phrases), 1), 3), -1, dtype=np.int32)
+        lens = np.zeros(max(len(phrases), 1), dtype=np.int32)
+        vals = np.zeros(max(len(phrases), 1))
+        for p, (phrase, value) in enumerate(phrases.items()):
+            words = phrase.split(" ")
+            lens[p] = len(words)
+            vals[p] = value
+            for k, word in enumerate(words):
+                ids[p, k] = self._token_id(word)
+        return ids, lens, vals
+
+    def _replace_emoji(self, text):
+        # character loop from polarity_scores, only run when an emoji is present
+        text_no_emoji = ""
+        prev_space = True
+        for chr in text:
+            if chr in self.emojis:
+                if not prev_space:
+                    text_no_emoji += ' '
+                text_no_emoji += self.emojis[chr]
+                prev_space = False
+            else:
+                text_no_emoji += chr
+                prev_space = chr == ' '
+        return text_no_emoji
+
+    def compound(self, texts):
+        ids, upper, offsets, cap_diff, punct = [], [], [0], [], []
+        for text in texts:
+            if not text.isascii() and not self.emojis.keys().isdisjoint(text):
+                text = self._replace_emoji(text)
+            text = text.strip()
+            words = [_strip_punc_if_word(w) for w in text.split()]
+
+            n_upper = 0
+            for word in words:
+                is_upper = word.isupper()
+                n_upper += is_upper
+                upper.append(is_upper)
+                ids.append(self._token_id(word.lower()))
+            offsets.append(len(ids))
+            cap_diff.append(0 < len(words) - n_upper < len(words))
+
+            ep_count = min(text.count("!"), 4)
+            qm_count = text.count("?")
+            qm_amplifier = 0
+            if qm_count > 1:
+                qm_amplifier = qm_count * 0.18 if qm_count <= 3 else 0.96
+            punct.append(ep_count * 0.292 + qm_amplifier)
+
+        scores = _score_docs(
+            np.asarray(ids, dtype=np.int32), np.asarray(upper, dtype=np.bool_),
+            np.asarray(offsets, dtype=np.int64), np.asarray(cap_diff, dtype=np.bool_),
+            np.asarray(punct, dtype=np.float64), COMPENSATED_SUM,
+            np.asarray(self._lex, dtype=np.float64), np.asarray(self._in_lex, dtype=np.bool_),
+            np.asarray(self._booster, dtype=np.float64), np.asarray(self._is_booster, dtype=np.bool_),
+            np.asarray(self._negated, dtype=np.bool_), np.asarray(self._code, dtype=np.int8),
+            self.sp_ids, self.sp_len, self.sp_val, self.bo_ids, self.bo_len, self.bo_val,
+        )
+        # polarity_scores rounds the compound to 4 places
+        return np.array([round(s, 4) for s in scores.tolist()])